@@ -2,7 +2,7 @@
 {
     # Informations du module
     'name': 'Gestion des Stages TechPal',
-    'version': '17.0.1.0.0',
+    'version': '17.0.1.0.1',
     'category': 'Ressources Humaines',
     'summary': 'Système de gestion des stages pour TechPal Casablanca',
 
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Migration 17.0.1.0.1 : le corps du modèle d'e-mail de création de stage est passé des
+marqueurs {{ ... }} (remplacés auparavant par une expression régulière) au moteur QWeb
+natif (t-out / t-field). L'enregistrement étant en noupdate, les bases existantes
+conservent l'ancien corps : il est rechargé depuis le fichier XML du module.
+"""
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    template = env.ref('internship_management.mail_template_stage_creation', raise_if_not_found=False)
+    # Seuls les corps encore au format {{ ... }} sont rechargés (les modèles déjà migrés
+    # ou personnalisés au nouveau format sont conservés)
+    if template and '{{' in (template.body_html or ''):
+        template.reset_template()
+        _logger.info("Modèle d'e-mail %s rechargé depuis les données du module.", template.name)
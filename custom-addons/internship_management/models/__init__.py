@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from . import internship_activity_mixin
 from . import internship_skill
 from . import internship_task
 from . import internship_area
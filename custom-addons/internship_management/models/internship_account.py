@@ -38,6 +38,7 @@ class InternshipAccount(models.Model):
         string='Stage',
         required=True,
         ondelete='cascade',
+        index=True,
         help="Stage associé à ce compte."
     )
 
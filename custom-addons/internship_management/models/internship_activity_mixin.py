@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Mixin pour la création groupée d'activités automatiques (alertes, rappels).
+"""
+
+from odoo import models
+
+
+class InternshipAutomatedActivityMixin(models.AbstractModel):
+    """Création en lot des activités automatiques des stages et des tâches.
+
+    Équivalent groupé de activity_schedule() : le type d'activité, le modèle et
+    l'échéance sont résolus une seule fois et toutes les activités sont créées
+    en un seul appel à create().
+    """
+    _name = 'internship.automated.activity.mixin'
+    _description = 'Mixin des Activités Automatiques de Stage'
+
+    def _create_automated_activities(self, activity_xmlid, user_getter, summary_getter, note):
+        """
+        Crée une activité par enregistrement ayant un utilisateur assigné.
+
+        :param activity_xmlid: identifiant XML du type d'activité
+        :param user_getter: fonction enregistrement -> utilisateur assigné (res.users)
+        :param summary_getter: fonction enregistrement -> résumé de l'activité
+        :param note: note commune, ou fonction enregistrement -> note
+        :return: les activités créées (mail.activity)
+
+        Les libellés sont traduits par l'appelant avant l'appel (_() ne trouve pas la
+        langue depuis une lambda) ; les fonctions ne font que les formater.
+        """
+        # Comme activity_schedule : automatisation désactivable par contexte, et activités
+        # marquées 'automated' pour ne pas contrôler l'accès du destinataire au document
+        # (un encadrant sans accès ne doit pas faire échouer tout le lot)
+        if self.env.context.get('mail_activity_automation_skip'):
+            return self.env['mail.activity']
+
+        activity_type = self.env.ref(activity_xmlid)
+        res_model_id = self.env['ir.model']._get_id(self._name)
+        date_deadline = activity_type._get_date_deadline()
+        activity_vals_list = []
+        for record in self:
+            user = user_getter(record)
+            if not user:
+                continue
+            activity_vals_list.append({
+                'activity_type_id': activity_type.id,
+                'res_model_id': res_model_id,
+                'res_id': record.id,
+                'user_id': user.id,
+                'summary': summary_getter(record),
+                'note': note(record) if callable(note) else note,
+                'date_deadline': date_deadline,
+                'automated': True,
+            })
+        return self.env['mail.activity'].create(activity_vals_list)
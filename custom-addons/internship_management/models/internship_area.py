@@ -121,9 +121,12 @@ class InternshipArea(models.Model):
 
     @api.depends('internship_ids')
     def _compute_internship_count(self):
-        """Calcule le nombre de stages dans ce domaine."""
+        """Calcule le nombre de stages dans ce domaine (une seule requête groupée)."""
+        counts = dict(self.env['internship.stage']._read_group(
+            [('area_id', 'in', self._origin.ids)], ['area_id'], ['__count']
+        ))
         for area in self:
-            area.internship_count = len(area.internship_ids)
+            area.internship_count = counts.get(area._origin, 0)
 
     # ===============================
     # CHAMPS TECHNIQUES
@@ -59,6 +59,7 @@ class InternshipDocument(models.Model):
         required=True,
         tracking=True,
         ondelete='cascade',
+        index=True,
         help="Stage auquel ce document est rattaché."
     )
 
@@ -280,20 +281,30 @@ class InternshipDocument(models.Model):
     def create(self, vals_list):
         """Surcharge de la méthode de création pour remplir automatiquement student_id."""
         # Remplir automatiquement student_id si l'utilisateur est un étudiant
+        # (l'étudiant de l'utilisateur courant n'est recherché qu'une fois pour tout le lot)
+        current_student = None
+        stages_by_id = {
+            stage.id: stage
+            for stage in self.env['internship.stage'].browse({
+                vals['stage_id'] for vals in vals_list if vals.get('stage_id')
+            })
+        }
         for vals in vals_list:
             if not vals.get('student_id') and vals.get('stage_id'):
                 # Vérifier si l'utilisateur actuel est un étudiant
-                student = self.env['internship.student'].search([
-                    ('user_id', '=', self.env.user.id)
-                ], limit=1)
+                if current_student is None:
+                    current_student = self.env['internship.student'].search([
+                        ('user_id', '=', self.env.user.id)
+                    ], limit=1)
+                student = current_student
                 if student:
                     # Vérifier que l'étudiant appartient au stage
-                    stage = self.env['internship.stage'].browse(vals['stage_id'])
+                    stage = stages_by_id[vals['stage_id']]
                     if student in stage.student_ids:
                         vals['student_id'] = student.id
             # Vérifier que si student_id est fourni, il appartient bien au stage
             elif vals.get('student_id') and vals.get('stage_id'):
-                stage = self.env['internship.stage'].browse(vals['stage_id'])
+                stage = stages_by_id[vals['stage_id']]
                 student = self.env['internship.student'].browse(vals['student_id'])
                 if student not in stage.student_ids:
                     raise ValidationError(_(
@@ -311,8 +322,8 @@ class InternshipDocument(models.Model):
 
     def action_submit_for_review(self):
         """Soumet le document pour révision."""
+        self.write({'state': 'submitted'})
         for doc in self:
-            doc.state = 'submitted'
             if doc.supervisor_id and doc.supervisor_id.user_id:
                 supervisor_partner = doc.supervisor_id.user_id.partner_id
                 if supervisor_partner:
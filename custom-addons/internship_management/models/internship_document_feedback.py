@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
 import logging
+from collections import defaultdict
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
@@ -31,6 +33,7 @@ class InternshipDocumentFeedback(models.Model):
         string='Document',
         required=True,  # Un retour doit toujours être lié à un document.
         ondelete='cascade',
+        index=True,
         tracking=True,
         help="Document concerné par ce retour."
     )
@@ -91,6 +94,7 @@ class InternshipDocumentFeedback(models.Model):
         related='document_id.stage_id',
         string='Stage Associé',
         store=True,
+        index=True,
         help="Stage auquel ce retour est indirectement lié."
     )
 
@@ -120,6 +124,8 @@ class InternshipDocumentFeedback(models.Model):
         et potentiellement changer le statut du document lié.
         """
         feedbacks = super().create(vals_list)
+        # Nouveau statut par document (le dernier retour l'emporte), appliqué en fin de boucle
+        state_by_document = {}
         for feedback in feedbacks:
             # Notifier tous les étudiants du stage via le chatter du document
             student_partners = feedback.stage_id.student_ids.mapped('user_id.partner_id')
@@ -133,9 +139,16 @@ class InternshipDocumentFeedback(models.Model):
 
             # Si le retour demande une révision, changer le statut du document
             if feedback.feedback_type == 'revision_required':
-                feedback.document_id.write({'state': 'rejected'})
+                state_by_document[feedback.document_id] = 'rejected'
             elif feedback.feedback_type == 'approval':
-                feedback.document_id.write({'state': 'approved'})
+                state_by_document[feedback.document_id] = 'approved'
+
+        # Une seule écriture par statut cible pour tous les documents concernés
+        documents_by_state = defaultdict(lambda: self.env['internship.document'])
+        for document, state in state_by_document.items():
+            documents_by_state[state] |= document
+        for state, documents in documents_by_state.items():
+            documents.write({'state': state})
 
         return feedbacks
 
@@ -9,11 +9,35 @@ import logging
 import re
 from datetime import timedelta
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError, UserError
 
 _logger = logging.getLogger(__name__)
 
+MEETING_TYPE_SELECTION = [
+    ('kickoff', 'Lancement'),
+    ('follow_up', 'Suivi'),
+    ('milestone', 'Revue d\'étape'),
+    ('defense', 'Soutenance'),
+    ('evaluation', 'Évaluation'),
+    ('emergency', 'Urgence'),
+    ('planning', 'Planning'),
+    ('other', 'Autre')
+]
+MEETING_TYPE_LABELS = dict(MEETING_TYPE_SELECTION)
+
+# Traductions françaises des jours et des mois pour le formatage des dates dans les emails
+DAYS_FR = {
+    'Monday': 'lundi', 'Tuesday': 'mardi', 'Wednesday': 'mercredi',
+    'Thursday': 'jeudi', 'Friday': 'vendredi', 'Saturday': 'samedi', 'Sunday': 'dimanche'
+}
+MONTHS_FR = {
+    'January': 'janvier', 'February': 'février', 'March': 'mars',
+    'April': 'avril', 'May': 'mai', 'June': 'juin',
+    'July': 'juillet', 'August': 'août', 'September': 'septembre',
+    'October': 'octobre', 'November': 'novembre', 'December': 'décembre'
+}
+
 
 class InternshipMeeting(models.Model):
     """
@@ -48,16 +72,7 @@ class InternshipMeeting(models.Model):
         help="Titre ou sujet de la réunion."
     )
 
-    meeting_type = fields.Selection([
-        ('kickoff', 'Lancement'),
-        ('follow_up', 'Suivi'),
-        ('milestone', 'Revue d\'étape'),
-        ('defense', 'Soutenance'),
-        ('evaluation', 'Évaluation'),
-        ('emergency', 'Urgence'),
-        ('planning', 'Planning'),
-        ('other', 'Autre')
-    ], string='Type de réunion', default='follow_up', tracking=True, required=True,
+    meeting_type = fields.Selection(MEETING_TYPE_SELECTION, string='Type de réunion', default='follow_up', tracking=True, required=True,
         help="Type de réunion planifiée.")
 
     state = fields.Selection([
@@ -124,6 +139,7 @@ class InternshipMeeting(models.Model):
         string='Date et Heure',
         required=True,
         tracking=True,
+        index=True,
         help="Date et heure prévues pour la réunion."
     )
 
@@ -230,6 +246,10 @@ class InternshipMeeting(models.Model):
         help="Indique si cet enregistrement est actif."
     )
 
+    def init(self):
+        """Index composite utilisé par le comptage des réunions à venir par stage."""
+        tools.create_index(self._cr, 'internship_meeting_stage_id_date_idx', self._table, ['stage_id', 'date'])
+
     # ===============================
     # CONTRAINTES
     # ===============================
@@ -237,8 +257,9 @@ class InternshipMeeting(models.Model):
     @api.constrains('date')
     def _check_meeting_date(self):
         """Vérifie que la date de la réunion est dans le futur pour les brouillons."""
+        now = fields.Datetime.now()
         for meeting in self:
-            if meeting.state == 'draft' and meeting.date and meeting.date < fields.Datetime.now():
+            if meeting.state == 'draft' and meeting.date and meeting.date < now:
                 raise ValidationError(_("La date de la réunion doit être dans le futur."))
 
     @api.constrains('duration')
@@ -269,23 +290,9 @@ class InternshipMeeting(models.Model):
             self.partner_ids = False
             return
 
-        partners = self.env['res.partner']
-
-        # Récupération des partenaires des étudiants
-        student_partners = self.stage_id.student_ids.mapped('user_id.partner_id')
-        if student_partners:
-            partners |= student_partners
-
-        # Récupération du partenaire de l'encadrant
-        supervisor_partner = self.stage_id.supervisor_id.user_id.partner_id
-        if supervisor_partner:
-            partners |= supervisor_partner
-
-        # Ajout de l'organisateur s'il existe déjà
-        if self.organizer_id.partner_id:
-            partners |= self.organizer_id.partner_id
-
-        self.partner_ids = partners
+        # Étudiants et encadrant du stage, plus l'organisateur s'il existe déjà :
+        # l'union de recordsets ignore les valeurs vides et les doublons
+        self.partner_ids = self.stage_id._get_stage_partners() | self.organizer_id.partner_id
 
     # ===============================
     # MÉTHODES D'ENVOI D'EMAILS
@@ -303,20 +310,10 @@ class InternshipMeeting(models.Model):
         if self.date:
             # Format: "lundi 19 novembre 2025 à 14:30"
             date_str = self.date.strftime('%A %d %B %Y à %H:%M')
-            # Traduire le jour de la semaine (optionnel, pour français)
-            days_fr = {
-                'Monday': 'lundi', 'Tuesday': 'mardi', 'Wednesday': 'mercredi',
-                'Thursday': 'jeudi', 'Friday': 'vendredi', 'Saturday': 'samedi', 'Sunday': 'dimanche'
-            }
-            months_fr = {
-                'January': 'janvier', 'February': 'février', 'March': 'mars',
-                'April': 'avril', 'May': 'mai', 'June': 'juin',
-                'July': 'juillet', 'August': 'août', 'September': 'septembre',
-                'October': 'octobre', 'November': 'novembre', 'December': 'décembre'
-            }
-            for en, fr in days_fr.items():
+            # Traduire le jour de la semaine et le mois (optionnel, pour français)
+            for en, fr in DAYS_FR.items():
                 date_str = date_str.replace(en, fr)
-            for en, fr in months_fr.items():
+            for en, fr in MONTHS_FR.items():
                 date_str = date_str.replace(en, fr)
         
         # Formater la date courte pour le sujet
@@ -327,8 +324,7 @@ class InternshipMeeting(models.Model):
         # Récupérer le libellé du type de réunion
         meeting_type_label = 'Réunion'
         if self.meeting_type:
-            selection = dict(self._fields['meeting_type'].selection)
-            meeting_type_label = selection.get(self.meeting_type, self.meeting_type)
+            meeting_type_label = MEETING_TYPE_LABELS.get(self.meeting_type, self.meeting_type)
         
         data = {
             'name': self.name or 'Réunion',
@@ -386,7 +382,7 @@ class InternshipMeeting(models.Model):
         # Gérer les conditions t-if pour location
         if data['location']:
             body_html = re.sub(r't-if="object\.location"\s+', '', body_html)
-        else:
+        elif 't-if="object.location"' in body_html:
             body_html = re.sub(
                 r'<li t-if="object\.location"[^>]*>.*?</li>',
                 '',
@@ -404,7 +400,7 @@ class InternshipMeeting(models.Model):
                 body_html,
                 flags=re.DOTALL
             )
-        else:
+        elif 't-if="object.meeting_url"' in body_html:
             body_html = re.sub(
                 r'<li t-if="object\.meeting_url"[^>]*>.*?</li>',
                 '',
@@ -415,7 +411,7 @@ class InternshipMeeting(models.Model):
         # Gérer les conditions t-if pour agenda
         if data['agenda']:
             body_html = re.sub(r't-if="object\.agenda"\s+', '', body_html)
-        else:
+        elif 't-if="object.agenda"' in body_html:
             body_html = re.sub(
                 r'<div t-if="object\.agenda"[^>]*>.*?</div>',
                 '',
@@ -447,56 +443,70 @@ class InternshipMeeting(models.Model):
         
         return subject, body_html, email_from
     
-    def _send_meeting_notification(self, template_xmlid):
+    def _send_meeting_notification(self, template_xmlid, force_send=True):
         """
-        Envoie les notifications email pour une réunion en utilisant le template spécifié.
+        Envoie les notifications email pour les réunions en utilisant le template spécifié.
         Prépare les données en Python et rend le template manuellement.
+        Fonctionne sur un ensemble de réunions : le template n'est récupéré qu'une fois
+        et tous les mails sont créés en un seul appel.
+        Avec force_send=False, les mails sont seulement mis en file d'attente et envoyés
+        par le cron de messagerie après le commit de la transaction courante.
         """
-        self.ensure_one()
-        
-        if not self.partner_ids:
-            _logger.warning(f"Aucun participant pour envoyer l'email de la réunion {self.name}")
+        meetings = self.filtered('partner_ids')
+        for meeting in self - meetings:
+            _logger.warning("Aucun participant pour envoyer l'email de la réunion %s", meeting.name)
+        if not meetings:
             return
-        
+
         # Récupérer le template email
         template = self.env.ref(template_xmlid, raise_if_not_found=False)
-        
+
         if not template:
-            _logger.warning(f"Template email {template_xmlid} non trouvé.")
+            _logger.warning("Template email %s non trouvé.", template_xmlid)
             return
-        
+
         try:
-            # Préparer toutes les données en Python
-            email_data = self._prepare_meeting_email_data()
-            
-            # Rendre le template avec les données préparées
-            subject, body_html, email_from = self._render_meeting_template(template, email_data)
-            
-            # Pour chaque partenaire, créer et envoyer un email
-            for partner in self.partner_ids:
-                if not partner.email:
-                    _logger.warning(f"Le partenaire {partner.name} (ID: {partner.id}) n'a pas d'email configuré.")
-                    continue
-                
-                # Créer le mail avec le contenu rendu
-                mail = self.env['mail.mail'].create({
-                    'subject': subject,
-                    'body_html': body_html,
-                    'email_from': email_from,
-                    'email_to': partner.email,
-                    'model': self._name,
-                    'res_id': self.id,
-                    'auto_delete': template.auto_delete,
-                })
-                
-                # Envoyer immédiatement
-                mail.send()
-            
-            _logger.info(f"Notifications email envoyées pour la réunion {self.name}")
-        except Exception as e:
-            _logger.error(f"Erreur lors de l'envoi des emails pour la réunion {self.name}: {str(e)}")
-            import traceback
-            _logger.error(traceback.format_exc())
+            mail_vals_list = []
+            for meeting in meetings:
+                # Préparer toutes les données en Python
+                email_data = meeting._prepare_meeting_email_data()
+
+                # Rendre le template avec les données préparées
+                subject, body_html, email_from = meeting._render_meeting_template(template, email_data)
+
+                # Pour chaque partenaire, préparer un email avec le contenu rendu
+                for partner in meeting.partner_ids:
+                    if not partner.email:
+                        _logger.warning("Le partenaire %s (ID: %s) n'a pas d'email configuré.",
+                                        partner.name, partner.id)
+                        continue
+
+                    mail_vals_list.append({
+                        'subject': subject,
+                        'body_html': body_html,
+                        'email_from': email_from,
+                        'email_to': partner.email,
+                        'model': self._name,
+                        'res_id': meeting.id,
+                        'auto_delete': template.auto_delete,
+                    })
+
+            if mail_vals_list:
+                # Créer tous les mails en une fois
+                mails = self.env['mail.mail'].create(mail_vals_list)
+                if force_send:
+                    mails.send()
+                else:
+                    # Réveiller le cron d'envoi, qui s'exécute dans sa propre transaction
+                    self.env.ref('mail.ir_cron_mail_scheduler_action')._trigger()
+
+            if force_send:
+                _logger.info("Notifications email envoyées pour les réunions %s", meetings.mapped('name'))
+            else:
+                _logger.info("Notifications email mises en file d'attente pour les réunions %s",
+                             meetings.mapped('name'))
+        except Exception:
+            _logger.exception("Erreur lors de l'envoi des emails pour les réunions %s", meetings.mapped('name'))
             # Ne pas bloquer si l'envoi d'email échoue
 
     # ===============================
@@ -531,14 +541,14 @@ class InternshipMeeting(models.Model):
     # MÉTHODES D'AFFICHAGE
     # ===============================
 
-    def name_get(self):
-        result = []
+    @api.depends('date', 'name', 'student_ids.full_name')
+    def _compute_display_name(self):
+        """Affichage personnalisé du nom : Date - Étudiants (Titre), calculé une fois par lot via display_name."""
         for record in self:
             date_str = fields.Date.to_string(record.date) if record.date else ''
             students = ', '.join(record.student_ids.mapped('full_name'))
             name = f"{date_str} - {students}" if students else date_str
             if record.name:
                 name = f"{name} ({record.name})"
-            result.append((record.id, name))
-        return result
+            record.display_name = name
 
@@ -5,7 +5,7 @@ Ce modèle permet aux étudiants de soumettre leurs présentations,
 aux encadrants de les réviser, et de suivre le cycle de vie
 d'approbation via le Chatter et les Activités Odoo.
 """
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError, ValidationError
 
 
@@ -82,6 +82,13 @@ class InternshipPresentation(models.Model):
                                 store=True,
                                 help="Indique si la date limite est dépassée.")
 
+    def init(self):
+        """Index utilisés par les statistiques de présentations et la présentation finale du stage."""
+        tools.create_index(self._cr, 'internship_presentation_stage_id_status_idx', self._table, ['stage_id', 'status'])
+        # Index partiel (petit) pour retrouver la dernière présentation approuvée d'un stage
+        tools.create_index(self._cr, 'internship_presentation_approved_idx', self._table,
+                           ['stage_id', 'create_date DESC'], where="status = 'approved'")
+
     # ===============================
     # CHAMPS CALCULÉS
     # ===============================
@@ -97,9 +104,10 @@ class InternshipPresentation(models.Model):
     @api.depends('due_date', 'status')
     def _compute_is_overdue(self):
         """Vérifie si la présentation est en retard."""
+        today = fields.Date.today()
         for record in self:
             record.is_overdue = (
-                    record.due_date and record.due_date < fields.Date.today() and
+                    record.due_date and record.due_date < today and
                     record.status in ['draft', 'revision_required']
             )
 
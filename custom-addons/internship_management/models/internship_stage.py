@@ -7,14 +7,54 @@ les évaluations et la gestion documentaire.
 """
 
 import logging
-import re
+from collections import defaultdict
 from datetime import timedelta
 
-from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo import models, fields, api, tools, _, _lt
+from odoo.exceptions import UserError, ValidationError
+from odoo.osv import expression
 
 _logger = logging.getLogger(__name__)
 
+# Titres des plannings automatiques, par numéro de semaine (traduits à l'utilisation)
+PLANNING_NAMES = {
+    1: _lt('Apprendre sur l\'entreprise'),
+    2: _lt('Apprendre sur le travail'),
+}
+
+# Ordre du jour des plannings automatiques, par numéro de semaine (traduit à l'utilisation)
+PLANNING_AGENDAS = {
+    1: _lt(
+        '<p><strong>Semaine 1 : Apprendre sur l\'entreprise</strong></p>'
+        '<p>Cette première semaine est dédiée à la découverte de l\'entreprise :</p>'
+        '<ul>'
+        '<li>Présentation de l\'entreprise et de son histoire</li>'
+        '<li>Organisation et structure</li>'
+        '<li>Culture d\'entreprise et valeurs</li>'
+        '<li>Processus et méthodologies utilisées</li>'
+        '<li>Rencontre avec les équipes</li>'
+        '</ul>'
+    ),
+    2: _lt(
+        '<p><strong>Semaine 2 : Apprendre sur le travail</strong></p>'
+        '<p>Cette deuxième semaine est dédiée à l\'apprentissage du travail :</p>'
+        '<ul>'
+        '<li>Découverte des outils et technologies utilisés</li>'
+        '<li>Formation sur les processus de travail</li>'
+        '<li>Prise en main des projets en cours</li>'
+        '<li>Intégration dans l\'équipe</li>'
+        '<li>Début des premières tâches</li>'
+        '</ul>'
+    ),
+}
+
+# Pourcentage d'achèvement fixe des états terminaux (aucun calcul nécessaire)
+TERMINAL_STATE_PROGRESS = {
+    'completed': 100.0,
+    'evaluated': 100.0,
+    'cancelled': 0.0,
+}
+
 
 class InternshipStage(models.Model):
     """
@@ -25,7 +65,7 @@ class InternshipStage(models.Model):
     """
     _name = 'internship.stage'
     _description = 'Gestion de Stage'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'internship.automated.activity.mixin']
     _order = 'start_date desc, title'
     _rec_name = 'title'
 
@@ -37,6 +77,7 @@ class InternshipStage(models.Model):
         string='Titre du Stage',
         required=True,
         tracking=True,
+        index='trigram',
         help="Sujet principal ou titre du projet de stage."
     )
 
@@ -44,10 +85,18 @@ class InternshipStage(models.Model):
         string='Numéro de Référence',
         readonly=True,
         copy=False,
+        index=True,
         default='Nouveau',
         help="Numéro de référence unique pour ce stage."
     )
 
+    display_name = fields.Char(
+        string="Nom Affiché",
+        compute='_compute_display_name',
+        store=True,
+        index='trigram'
+    )
+
     # ===============================
     # CLASSIFICATION
     # ===============================
@@ -79,12 +128,14 @@ class InternshipStage(models.Model):
         string='Encadrant(e)',
         tracking=True,
         ondelete='restrict',
+        index=True,
         help="Encadrant(e) académique ou professionnel."
     )
 
     area_id = fields.Many2one(
         'internship.area',
         string='Domaine d\'Expertise',
+        index=True,
         help="Domaine d'expertise de ce stage."
     )
 
@@ -103,6 +154,7 @@ class InternshipStage(models.Model):
     start_date = fields.Date(
         string='Date de Début',
         tracking=True,
+        index=True,
         help="Date de début officielle du stage."
     )
 
@@ -114,16 +166,13 @@ class InternshipStage(models.Model):
 
     @api.depends('start_date', 'end_date')
     def _compute_duration_days(self):
-        """Calcule la durée du stage en jours."""
+        """Calcule la durée du stage en jours (chaque date n'est lue qu'une fois par stage)."""
         for stage in self:
-            if stage.start_date and stage.end_date:
-                if stage.end_date >= stage.start_date:
-                    delta = stage.end_date - stage.start_date
-                    stage.duration_days = delta.days + 1
-                else:
-                    stage.duration_days = 0
-            else:
-                stage.duration_days = 0
+            start_date, end_date = stage.start_date, stage.end_date
+            stage.duration_days = (
+                (end_date - start_date).days + 1
+                if start_date and end_date and end_date >= start_date else 0
+            )
 
     duration_days = fields.Integer(
         string='Durée (Jours)',
@@ -136,8 +185,11 @@ class InternshipStage(models.Model):
     # DESCRIPTION DÉTAILLÉE DU SUJET
     # ===============================
 
+    # Les champs Html volumineux ne sont pas préchargés avec les autres champs du stage
+    # (listes, kanban, calculs) : ils ne sont lus que lorsqu'ils sont réellement affichés.
     subject_proposal = fields.Html(
         string='Description Détaillée du Sujet',
+        prefetch=False,
         help="Description détaillée du sujet de stage. Ce champ peut être utilisé pour fournir des informations supplémentaires sur le projet, les objectifs, les technologies utilisées, etc."
     )
 
@@ -152,11 +204,13 @@ class InternshipStage(models.Model):
 
     project_description = fields.Html(
         string='Description du Projet',
+        prefetch=False,
         help="Description détaillée du projet de stage et de son contexte."
     )
 
     learning_objectives = fields.Html(
         string='Objectifs Pédagogiques',
+        prefetch=False,
         help="Objectifs pédagogiques et professionnels à atteindre."
     )
 
@@ -164,47 +218,53 @@ class InternshipStage(models.Model):
     # SUIVI DE LA PROGRESSION
     # ===============================
 
-    @api.depends('task_ids.state', 'start_date', 'end_date', 'state')
+    @api.depends('task_count', 'completed_task_count', 'start_date', 'end_date', 'duration_days', 'state')
     def _compute_completion_percentage(self):
         """
-        Calcule le pourcentage d'achèvement.
+        Calcule le pourcentage d'achèvement à partir des compteurs de tâches stockés :
+        un changement d'état du stage ne relance pas le comptage des tâches.
         - Si le stage est terminé ou évalué, le pourcentage est de 100%.
         - Si des tâches existent, le calcul se base sur le ratio de tâches terminées.
         - Sinon, il se base sur le temps écoulé par rapport à la durée totale.
         """
+        # Date du jour (fuseau de l'utilisateur) calculée une seule fois pour tout le lot
+        today = fields.Date.context_today(self)
+        # Un seul parcours du lot : les états terminaux reçoivent leur valeur constante
+        # au passage, sans filtrages successifs ni différences de recordsets
         for stage in self:
-            if stage.state in ('completed', 'evaluated'):
-                stage.completion_percentage = 100.0
-                continue
-            elif stage.state == 'cancelled':
-                stage.completion_percentage = 0.0
+            terminal_progress = TERMINAL_STATE_PROGRESS.get(stage.state)
+            if terminal_progress is not None:
+                stage.completion_percentage = terminal_progress
                 continue
 
-            progress_value = 0.0
-            total_tasks = len(stage.task_ids)
-            if total_tasks > 0:
-                completed_tasks = len(stage.task_ids.filtered(lambda t: t.state == 'done'))
-                progress_value = (completed_tasks / total_tasks) * 100.0
+            # Chaque champ n'est lu qu'une fois par stage (variables locales)
+            task_count = stage.task_count
+            if task_count:
+                progress_value = stage.completed_task_count * 100.0 / task_count
             else:
-                if stage.start_date and stage.end_date and stage.end_date >= stage.start_date:
-                    total_duration = (stage.end_date - stage.start_date).days + 1
-                    if total_duration > 0:
-                        today = fields.Date.context_today(stage)
-                        if today <= stage.start_date:
-                            elapsed_days = 0
-                        elif today >= stage.end_date:
-                            elapsed_days = total_duration
-                        else:
-                            elapsed_days = (today - stage.start_date).days
-                        progress_value = (elapsed_days / total_duration) * 100.0
-
-            stage.completion_percentage = max(0.0, min(100.0, round(progress_value, 2)))
+                # duration_days (stocké) vaut 0 si une date manque ou si la fin précède le début
+                total_duration = stage.duration_days
+                if total_duration > 0:
+                    start_date = stage.start_date
+                    if today <= start_date:
+                        elapsed_days = 0
+                    elif today >= stage.end_date:
+                        elapsed_days = total_duration
+                    else:
+                        elapsed_days = (today - start_date).days
+                    progress_value = elapsed_days * 100.0 / total_duration
+                else:
+                    progress_value = 0.0
 
+            stage.completion_percentage = (
+                0.0 if progress_value < 0.0 else 100.0 if progress_value > 100.0 else round(progress_value, 2)
+            )
+
+    # Indicateur dérivé recalculé à chaque changement de tâche : pas de suivi dans le Chatter
     completion_percentage = fields.Float(
         string='Achèvement %',
         compute='_compute_completion_percentage',
         store=True,
-        tracking=True,
         help="Pourcentage global d'achèvement du stage."
     )
 
@@ -263,11 +323,30 @@ class InternshipStage(models.Model):
 
     @api.depends('task_ids', 'task_ids.state')
     def _compute_task_stats(self):
-        """Calcule les statistiques sur les tâches."""
+        """
+        Calcule les statistiques sur les tâches (une seule requête groupée par stage et statut).
+        Les tâches étant éditables dans le formulaire du stage, un enregistrement en cours
+        d'édition (NewId) est compté en mémoire à partir de task_ids, non encore enregistré.
+        """
+        counts = defaultdict(lambda: defaultdict(int))
+        if all(isinstance(stage.id, int) for stage in self):
+            task_groups = self.env['internship.todo']._read_group(
+                [('stage_id', 'in', self.ids)],
+                ['stage_id', 'state'],
+                ['__count'],
+            )
+            for task_stage, task_state, count in task_groups:
+                counts[task_stage.id][task_state] = count
+        else:
+            for stage in self:
+                for task in stage.task_ids:
+                    counts[stage.id][task.state] += 1
+
         for stage in self:
-            stage.task_count = len(stage.task_ids)
-            stage.completed_task_count = len(stage.task_ids.filtered(lambda t: t.state == 'done'))
-            stage.pending_task_count = len(stage.task_ids.filtered(lambda t: t.state in ['todo', 'in_progress']))
+            stage_counts = counts[stage.id]
+            stage.task_count = sum(stage_counts.values())
+            stage.completed_task_count = stage_counts['done']
+            stage.pending_task_count = stage_counts['todo'] + stage_counts['in_progress']
 
     task_count = fields.Integer(string='Tâches Totales', compute='_compute_task_stats', store=True)
     completed_task_count = fields.Integer(string='Tâches Terminées', compute='_compute_task_stats', store=True)
@@ -275,40 +354,70 @@ class InternshipStage(models.Model):
 
     @api.depends('presentation_ids', 'presentation_ids.status')
     def _compute_presentation_stats(self):
-        """Calcule les statistiques sur les présentations."""
+        """Calcule les statistiques sur les présentations (une seule requête groupée par stage et statut)."""
+        counts = defaultdict(lambda: defaultdict(int))
+        presentation_groups = self.env['internship.presentation']._read_group(
+            [('stage_id', 'in', self._origin.ids)],
+            ['stage_id', 'status'],
+            ['__count'],
+        )
+        for presentation_stage, status, count in presentation_groups:
+            counts[presentation_stage.id][status] = count
+
         for stage in self:
-            stage.presentation_count = len(stage.presentation_ids)
-            stage.pending_presentation_count = len(
-                stage.presentation_ids.filtered(lambda p: p.status in ['submitted', 'revision_required']))
+            stage_counts = counts[stage._origin.id]
+            stage.presentation_count = sum(stage_counts.values())
+            stage.pending_presentation_count = stage_counts['submitted'] + stage_counts['revision_required']
 
-    presentation_count = fields.Integer(string='Nb Présentations', compute='_compute_presentation_stats', store=True)
+    # Compteurs non stockés : calculés à l'affichage du formulaire par une requête groupée indexée,
+    # sans réécrire le stage à chaque modification d'une présentation ou d'une réunion.
+    presentation_count = fields.Integer(string='Nb Présentations', compute='_compute_presentation_stats')
     pending_presentation_count = fields.Integer(string='Présentations en Attente',
-                                                compute='_compute_presentation_stats', store=True)
+                                                compute='_compute_presentation_stats')
 
     @api.depends('presentation_ids.status')
     def _compute_final_presentation(self):
-        """Détermine la présentation finale approuvée."""
+        """
+        Détermine la présentation finale approuvée (la plus récente, selon l'ordre du modèle).
+        Champ non stocké : calculé à l'affichage via l'index (stage_id, status), sans
+        recalcul du stage à chaque modification d'une présentation.
+        """
+        # Un seul stage (formulaire) : limit=1 suffit, servi par l'index partiel des approuvées
+        approved_presentations = self.env['internship.presentation'].search([
+            ('stage_id', 'in', self._origin.ids),
+            ('status', '=', 'approved'),
+        ], limit=1 if len(self) == 1 else None)
+        final_by_stage = {}
+        for presentation in approved_presentations:
+            final_by_stage.setdefault(presentation.stage_id.id, presentation)
+
         for stage in self:
-            approved_presentation = stage.presentation_ids.filtered(lambda p: p.status == 'approved')
-            stage.final_presentation_id = approved_presentation[0] if approved_presentation else False
+            stage.final_presentation_id = final_by_stage.get(stage._origin.id, False)
 
     final_presentation_id = fields.Many2one(
         'internship.presentation', string="Présentation Finale Approuvée",
-        compute='_compute_final_presentation', store=True,
+        compute='_compute_final_presentation',
         help="La dernière présentation approuvée pour la soutenance."
     )
 
     @api.depends('meeting_ids', 'meeting_ids.date')
     def _compute_meeting_stats(self):
-        """Calcule les statistiques sur les réunions."""
+        """Calcule les statistiques sur les réunions (requêtes groupées par stage)."""
+        now = fields.Datetime.now()
+        Meeting = self.env['internship.meeting']
+        domain = [('stage_id', 'in', self._origin.ids)]
+        meeting_counts = dict(Meeting._read_group(domain, ['stage_id'], ['__count']))
+        upcoming_counts = dict(Meeting._read_group(
+            domain + [('date', '>', now)], ['stage_id'], ['__count']
+        ))
+
         for stage in self:
-            stage.meeting_count = len(stage.meeting_ids)
-            stage.upcoming_meeting_count = len(stage.meeting_ids.filtered(
-                lambda m: m.date and m.date > fields.Datetime.now()
-            ))
+            origin = stage._origin
+            stage.meeting_count = meeting_counts.get(origin, 0)
+            stage.upcoming_meeting_count = upcoming_counts.get(origin, 0)
 
-    meeting_count = fields.Integer(string='Nb Réunions', compute='_compute_meeting_stats', store=True)
-    upcoming_meeting_count = fields.Integer(string='Réunions à Venir', compute='_compute_meeting_stats', store=True)
+    meeting_count = fields.Integer(string='Nb Réunions', compute='_compute_meeting_stats')
+    upcoming_meeting_count = fields.Integer(string='Réunions à Venir', compute='_compute_meeting_stats')
 
     # ===============================
     # ÉVALUATION
@@ -316,7 +425,8 @@ class InternshipStage(models.Model):
 
     final_grade = fields.Float(string='Note Finale', digits=(4, 2), help="Note finale du stage (sur 20).")
     defense_grade = fields.Float(string='Note de Soutenance', digits=(4, 2), help="Note de la soutenance (sur 20).")
-    evaluation_feedback = fields.Html(string='Feedback d\'Évaluation', help="Feedback détaillé de l'encadrant(e).")
+    evaluation_feedback = fields.Html(string='Feedback d\'Évaluation', prefetch=False,
+                                      help="Feedback détaillé de l'encadrant(e).")
 
     # ===============================
     # GESTION DE LA SOUTENANCE
@@ -354,6 +464,28 @@ class InternshipStage(models.Model):
 
     active = fields.Boolean(default=True, string='Actif', help="Indique si cet enregistrement de stage est actif.")
 
+    # Dénormalisé et indexé pour le cron de surveillance (évite de parcourir mail_activity)
+    has_open_activities = fields.Boolean(
+        string='Activités en Cours',
+        compute='_compute_has_open_activities',
+        compute_sudo=True,
+        store=True,
+        index=True,
+        help="Indique si des activités sont planifiées sur ce stage."
+    )
+
+    @api.depends('activity_ids')
+    def _compute_has_open_activities(self):
+        for stage in self:
+            stage.has_open_activities = bool(stage.activity_ids)
+
+    def init(self):
+        """Index utilisés par le cron de surveillance et les listes de soutenances."""
+        tools.create_index(self._cr, 'internship_stage_state_write_date_idx', self._table, ['state', 'write_date'])
+        # Index partiel : seules les soutenances planifiées sont indexées (listes triées par date)
+        tools.create_index(self._cr, 'internship_stage_defense_date_idx', self._table, ['defense_date'],
+                           where='defense_date IS NOT NULL')
+
     # ===============================
     # CONTRAINTES DE VALIDATION
     # ===============================
@@ -361,18 +493,17 @@ class InternshipStage(models.Model):
     @api.constrains('start_date', 'end_date')
     def _check_date_consistency(self):
         """Vérifie que la date de fin est postérieure à la date de début."""
-        for stage in self:
-            if stage.start_date and stage.end_date and stage.start_date > stage.end_date:
-                raise ValidationError(_("La date de fin doit être après la date de début."))
+        # Un seul prédicat par stage, arrêté au premier stage invalide
+        if any(stage.start_date and stage.end_date and stage.start_date > stage.end_date for stage in self):
+            raise ValidationError(_("La date de fin doit être après la date de début."))
 
     @api.constrains('final_grade', 'defense_grade')
     def _check_grade_range(self):
         """Vérifie que les notes sont dans une plage valide (0-20)."""
-        for stage in self:
-            if stage.final_grade and not (0 <= stage.final_grade <= 20):
-                raise ValidationError(_("La note finale doit être entre 0 et 20."))
-            if stage.defense_grade and not (0 <= stage.defense_grade <= 20):
-                raise ValidationError(_("La note de soutenance doit être entre 0 et 20."))
+        if any(not 0 <= stage.final_grade <= 20 for stage in self if stage.final_grade):
+            raise ValidationError(_("La note finale doit être entre 0 et 20."))
+        if any(not 0 <= stage.defense_grade <= 20 for stage in self if stage.defense_grade):
+            raise ValidationError(_("La note de soutenance doit être entre 0 et 20."))
 
     # ===============================
     # MÉTHODES CRUD
@@ -386,396 +517,306 @@ class InternshipStage(models.Model):
         - Envoyer les notifications email à tous les responsables
         - Créer automatiquement les plannings pour les 2 premières semaines
         """
-        for vals in vals_list:
-            if vals.get('reference_number', 'Nouveau') == 'Nouveau':
-                vals['reference_number'] = self.env['ir.sequence'].next_by_code('internship.stage') or 'STG-N/A'
+        new_vals_list = [vals for vals in vals_list if vals.get('reference_number', 'Nouveau') == 'Nouveau']
+        if new_vals_list:
+            # Résoudre la séquence une seule fois pour tout le lot (même règle que next_by_code)
+            sequence = self.env['ir.sequence'].search([
+                ('code', '=', 'internship.stage'),
+                ('company_id', 'in', [self.env.company.id, False]),
+            ], order='company_id', limit=1)
+            if not sequence:
+                _logger.warning("Séquence 'internship.stage' introuvable.")
+                references = ['STG-N/A'] * len(new_vals_list)
+            else:
+                references = self._reserve_reference_numbers(sequence, len(new_vals_list))
+            for vals, reference in zip(new_vals_list, references):
+                vals['reference_number'] = reference
 
         stages = super().create(vals_list)
 
-        for stage in stages:
-            _logger.info(f"Stage créé : {stage.reference_number} - {stage.title}")
-            
-            # 1. Envoyer les notifications email à tous les responsables
-            stage._send_creation_notifications()
-            
-            # 2. Créer automatiquement les plannings pour les 2 premières semaines
-            if stage.start_date:
-                stage._create_automatic_plannings()
-            
-            # 3. Notifier tous les étudiants via le Chatter (garder pour compatibilité)
-            for student in stage.student_ids:
-                if student.user_id and student.user_id.partner_id:
-                    stage.message_post(
-                        body=_(
-                            "Bienvenue ! Vous avez été assigné(e) au stage "
-                            "\"<strong>%s</strong>\". Veuillez consulter les détails.",
-                            stage.title
-                        ),
-                        partner_ids=[student.user_id.partner_id.id],
-                        message_type='comment',
-                        subtype_xmlid='mail.mt_comment',
-                    )
+        # 1. Envoyer les notifications email à tous les responsables (en un seul lot)
+        stages._send_creation_notifications()
+
+        # 2. Créer automatiquement les plannings pour les 2 premières semaines
+        stages.filtered('start_date')._create_automatic_plannings()
+
+        _logger.info("Stage(s) créé(s) : %s", stages.mapped('reference_number'))
+
+        # 3. Notifier tous les étudiants via le Chatter
+        stages._post_welcome_messages()
         return stages
 
-    def _prepare_email_data(self):
+    def _post_welcome_messages(self):
         """
-        Prépare toutes les données pour l'email en Python.
-        Retourne un dictionnaire avec toutes les valeurs formatées.
+        Publie le message de bienvenue (un seul message pour tous les étudiants d'un stage).
+        Sous-type résolu une seule fois ; les emails sont mis en file d'attente et envoyés
+        par lots par le cron de messagerie plutôt qu'un envoi SMTP par stage.
         """
-        self.ensure_one()
-        
-        # Préparer les données du stage
-        # Récupérer le libellé du type de stage au lieu de la valeur technique
-        internship_type_label = 'Non spécifié'
-        if self.internship_type:
-            # Récupérer la sélection du champ
-            selection = dict(self._fields['internship_type'].selection)
-            internship_type_label = selection.get(self.internship_type, self.internship_type)
-        
-        data = {
-            'title': self.title or 'Sans titre',
-            'reference_number': self.reference_number or 'N/A',
-            'internship_type': internship_type_label,
-            'start_date': self.start_date.strftime('%d/%m/%Y') if self.start_date else 'Non spécifiée',
-            'end_date': self.end_date.strftime('%d/%m/%Y') if self.end_date else 'Non spécifiée',
-            'supervisor_name': self.supervisor_id.name if self.supervisor_id else 'Non spécifié',
-            'students': [],
-            'base_url': self.get_base_url(),
-            'stage_id': self.id,
-        }
-        
-        # Préparer la liste des étudiants
-        for student in self.student_ids:
-            data['students'].append({
-                'full_name': student.full_name,
-            })
-        
-        return data
-    
-    def _render_email_template(self, template, data):
+        subtype_id = self.env['ir.model.data']._xmlid_to_res_id('mail.mt_comment')
+        for stage in self.with_context(mail_notify_force_send=False):
+            student_partner_ids = stage.student_ids.mapped('user_id.partner_id').ids
+            if student_partner_ids:
+                stage.message_post(
+                    body=self.env['ir.qweb']._render('internship_management.message_stage_welcome', {'stage': stage}),
+                    partner_ids=student_partner_ids,
+                    message_type='comment',
+                    subtype_id=subtype_id,
+                )
+
+    @api.model
+    def _reserve_reference_numbers(self, sequence, count):
         """
-        Rend le template email avec les données préparées.
-        Remplace les variables {{ }} par les valeurs réelles.
-        Utilise des regex flexibles pour gérer les variations d'espaces.
+        Réserve `count` numéros consécutifs de la séquence en une seule requête
+        (un seul nextval groupé, ou un seul verrou/UPDATE pour une séquence sans trou).
+        Les séquences par plage de dates passent par le tirage standard, numéro par numéro.
         """
-        # Rendre le sujet avec regex pour gérer les variations d'espaces
-        subject = re.sub(r'\{\{\s*object\.title\s*\}\}', data['title'], template.subject)
-        # Nettoyer le sujet : supprimer les retours à la ligne et les espaces en début/fin
-        subject = re.sub(r'[\r\n]+', ' ', subject)  # Remplacer les retours à la ligne par des espaces
-        subject = subject.strip()  # Supprimer les espaces en début/fin
-        
-        # Rendre le corps HTML
-        body_html = template.body_html
-        
-        # Remplacer les variables simples avec regex pour gérer les espaces
-        body_html = re.sub(r'\{\{\s*object\.title\s*\}\}', data['title'], body_html)
-        body_html = re.sub(r'\{\{\s*object\.reference_number\s*\}\}', data['reference_number'], body_html)
-        body_html = re.sub(r'\{\{\s*object\.supervisor_id\.name\s*\}\}', data['supervisor_name'], body_html)
-        
-        # Remplacer object.internship_type or 'Non spécifié' (expression complexe)
-        body_html = re.sub(
-            r'\{\{\s*object\.internship_type\s+or\s+[\'"]Non spécifié[\'"]\s*\}\}',
-            data['internship_type'],
-            body_html
-        )
-        
-        # Remplacer les dates (avec gestion des conditions t-if)
-        if data['start_date'] != 'Non spécifiée':
-            # Remplacer la variable de date avec regex
-            body_html = re.sub(
-                r'\{\{\s*object\.start_date\.strftime\([\'"]%d/%m/%Y[\'"]\)\s*\}\}',
-                data['start_date'],
-                body_html
-            )
-            # Supprimer les balises t-if pour start_date si la date existe
-            body_html = re.sub(r't-if="object\.start_date"\s+', '', body_html)
-        else:
-            # Supprimer toute la ligne li si la date n'existe pas
-            body_html = re.sub(
-                r'<li t-if="object\.start_date"[^>]*>.*?</li>',
-                '',
-                body_html,
-                flags=re.DOTALL
-            )
-        
-        if data['end_date'] != 'Non spécifiée':
-            # Remplacer la variable de date avec regex
-            body_html = re.sub(
-                r'\{\{\s*object\.end_date\.strftime\([\'"]%d/%m/%Y[\'"]\)\s*\}\}',
-                data['end_date'],
-                body_html
+        if sequence.use_date_range:
+            return [sequence._next() for _i in range(count)]
+
+        if sequence.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ('ir_sequence_%03d' % sequence.id, count),
             )
-            body_html = re.sub(r't-if="object\.end_date"\s+', '', body_html)
+            numbers = [row[0] for row in self.env.cr.fetchall()]
         else:
-            body_html = re.sub(
-                r'<li t-if="object\.end_date"[^>]*>.*?</li>',
-                '',
-                body_html,
-                flags=re.DOTALL
+            # Écritures ORM en attente sur la séquence envoyées avant la lecture SQL,
+            # sinon number_next serait lu périmé puis écrasé par l'UPDATE
+            sequence.flush_recordset(['number_next', 'number_increment'])
+            self.env.cr.execute(
+                "SELECT number_next FROM ir_sequence WHERE id = %s FOR UPDATE NOWAIT",
+                (sequence.id,),
             )
-        
-        # Remplacer la liste des étudiants
-        if data['students']:
-            students_html = ''
-            for student in data['students']:
-                # Le modèle student n'a que full_name, pas name, donc on affiche juste full_name
-                students_html += f'<li style="margin: 5px 0;">{student["full_name"]}</li>'
-            
-            # Remplacer toute la boucle t-foreach avec regex
-            # Le pattern doit capturer le <li> complet avec t-foreach, en gérant les retours à la ligne
-            # Pattern plus flexible pour gérer les variations d'espaces et retours à la ligne
-            # Note: le template utilise student.name mais le modèle n'a que full_name, donc on remplace les deux
-            pattern = r'<li\s+t-foreach="object\.student_ids"\s+t-as="student"[^>]*>[\s\S]*?\{\{\s*student\.name\s*\}\}[\s\S]*?\(\{\{\s*student\.full_name\s*\}\}\)[\s\S]*?</li>'
-            body_html = re.sub(pattern, students_html, body_html)
-            
-            # Supprimer l'attribut t-if de la div parente
-            body_html = re.sub(
-                r'<div\s+t-if="object\.student_ids"\s+',
-                '<div ',
-                body_html
+            number_next = self.env.cr.fetchone()[0]
+            self.env.cr.execute(
+                "UPDATE ir_sequence SET number_next = number_next + %s WHERE id = %s",
+                (sequence.number_increment * count, sequence.id),
             )
-        else:
-            # Supprimer toute la section étudiants si vide (div avec t-if)
-            body_html = re.sub(
-                r'<div\s+t-if="object\.student_ids"[^>]*>.*?</div>',
-                '',
-                body_html,
-                flags=re.DOTALL
-            )
-        
-        # Remplacer l'URL du bouton avec regex
-        url = f"{data['base_url']}/web#id={data['stage_id']}&amp;model=internship.stage&amp;view_type=form"
-        body_html = re.sub(
-            r't-att-href="[^"]*object\.get_base_url\(\)[^"]*"',
-            f'href="{url}"',
-            body_html
-        )
-        
-        return subject, body_html
-    
+            sequence.invalidate_recordset(['number_next'])
+            numbers = [number_next + i * sequence.number_increment for i in range(count)]
+
+        return [sequence.get_next_char(number) for number in numbers]
+
+    def _get_stage_partners(self):
+        """
+        Partenaires de l'encadrant et des étudiants du stage, sans doublons.
+        Un Many2one vide renvoie un recordset vide : l'union remplace les tests en cascade.
+        """
+        self.ensure_one()
+        return self.supervisor_id.user_id.partner_id | self.student_ids.user_id.partner_id
+
     def _send_creation_notifications(self):
         """
-        Envoie les notifications email à tous les responsables lors de la création d'un stage.
+        Envoie les notifications email à tous les responsables lors de la création des stages.
         Notifie : encadrant, étudiants, coordinateur si défini.
+        Le mail est généré par mail.template.send_mail, uniquement pour les stages
+        ayant au moins un destinataire, puis envoyé par le cron de messagerie.
         """
-        self.ensure_one()
-        
+        # Collecter, pour chaque stage, tous les partenaires à notifier (sans doublons)
+        partner_ids_by_stage = {}
+        for stage in self:
+            partner_ids = set(stage._get_stage_partners().ids)
+
+            # Ajouter le coordinateur si défini (à adapter selon votre modèle)
+            # Exemple si vous avez un champ coordinator_id :
+            # if stage.coordinator_id and stage.coordinator_id.user_id and stage.coordinator_id.user_id.partner_id:
+            #     partner_ids.add(stage.coordinator_id.user_id.partner_id.id)
+
+            if partner_ids:
+                partner_ids_by_stage[stage.id] = list(partner_ids)
+
+        if not partner_ids_by_stage:
+            return
+
+        # Ne garder que les partenaires ayant une adresse email
+        all_partners = self.env['res.partner'].browse(
+            {partner_id for partner_ids in partner_ids_by_stage.values() for partner_id in partner_ids}
+        )
+        missing = all_partners.filtered(lambda p: not p.email)
+        if missing:
+            _logger.warning(
+                "Partenaire(s) sans email configuré : %s (IDs: %s)",
+                ', '.join(missing.mapped('name')), missing.ids
+            )
+        # Listes d'ids des destinataires préparées ici, une fois par stage, pour être
+        # passées telles quelles à la commande (6, 0, ids) lors de l'envoi
+        missing_ids = set(missing.ids)
+        recipients_by_stage = {}
+        for stage_id, partner_ids in partner_ids_by_stage.items():
+            recipient_ids = [partner_id for partner_id in partner_ids if partner_id not in missing_ids]
+            if recipient_ids:
+                recipients_by_stage[stage_id] = recipient_ids
+
+        if not recipients_by_stage:
+            return
+
         # Récupérer le template email
         template = self.env.ref(
             'internship_management.mail_template_stage_creation',
             raise_if_not_found=False
         )
-        
+
         if not template:
             _logger.warning("Template email pour la création de stage non trouvé.")
             return
-        
-        # Collecter tous les partenaires à notifier
-        partner_ids = []
-        
-        # Ajouter l'encadrant
-        if self.supervisor_id and self.supervisor_id.user_id and self.supervisor_id.user_id.partner_id:
-            partner_ids.append(self.supervisor_id.user_id.partner_id.id)
-        
-        # Ajouter tous les étudiants
-        for student in self.student_ids:
-            if student.user_id and student.user_id.partner_id:
-                partner_ids.append(student.user_id.partner_id.id)
-        
-        # Ajouter le coordinateur si défini (à adapter selon votre modèle)
-        # Exemple si vous avez un champ coordinator_id :
-        # if self.coordinator_id and self.coordinator_id.user_id and self.coordinator_id.user_id.partner_id:
-        #     partner_ids.append(self.coordinator_id.user_id.partner_id.id)
-        
-        # Envoyer l'email à tous les partenaires
-        if partner_ids:
-            try:
-                # Préparer toutes les données en Python
-                email_data = self._prepare_email_data()
-                
-                # Rendre le template avec les données préparées
-                subject, body_html = self._render_email_template(template, email_data)
-                
-                # Récupérer l'email_from du template ou utiliser celui de l'utilisateur
-                email_from = self.env.user.email_formatted
-                if template.email_from:
-                    # Essayer de rendre email_from si nécessaire
-                    email_from = template.email_from.replace('{{ user.email_formatted }}', self.env.user.email_formatted)
-                    # Nettoyer email_from : supprimer les retours à la ligne et les espaces en début/fin
-                    email_from = re.sub(r'[\r\n]+', ' ', email_from)  # Remplacer les retours à la ligne par des espaces
-                    email_from = email_from.strip()  # Supprimer les espaces en début/fin
-                
-                # Pour chaque partenaire, créer et envoyer un email
-                for partner_id in partner_ids:
-                    partner = self.env['res.partner'].browse(partner_id)
-                    if not partner.email:
-                        _logger.warning(f"Le partenaire {partner.name} (ID: {partner_id}) n'a pas d'email configuré.")
-                        continue
-                    
-                    # Créer le mail avec le contenu rendu
-                    mail = self.env['mail.mail'].create({
-                        'subject': subject,
-                        'body_html': body_html,
-                        'email_from': email_from,
-                        'email_to': partner.email,
-                        'model': self._name,
-                        'res_id': self.id,
-                        'auto_delete': False,
-                    })
-                    
-                    # Envoyer immédiatement
-                    mail.send()
-                    
-                _logger.info(f"Notifications email envoyées à {len(partner_ids)} partenaire(s) pour le stage {self.reference_number}")
-            except Exception as e:
-                _logger.error(f"Erreur lors de l'envoi des emails pour le stage {self.reference_number}: {str(e)}")
-                import traceback
-                _logger.error(traceback.format_exc())
-                # Ne pas bloquer la création du stage si l'envoi d'email échoue
+
+        stages = self.browse(list(recipients_by_stage))
+        try:
+            # Un seul mail par stage pour tous ses destinataires, rendu par le template et mis
+            # en file d'attente : l'envoi SMTP est fait par le cron de messagerie, hors requête
+            for stage in stages:
+                template.send_mail(
+                    stage.id,
+                    force_send=False,
+                    email_values={
+                        'recipient_ids': [(6, 0, recipients_by_stage[stage.id])],
+                        'email_to': False,
+                    },
+                )
+            self.env.ref('mail.ir_cron_mail_scheduler_action')._trigger()
+            _logger.info("Notifications email mises en file d'attente pour %s stage(s)", len(stages))
+        except Exception:
+            _logger.exception("Erreur lors de l'envoi des emails de création de stage %s",
+                              stages.mapped('reference_number'))
+            # Ne pas bloquer la création du stage si l'envoi d'email échoue
 
     def _create_automatic_plannings(self):
         """
-        Crée automatiquement deux plannings (meetings de type 'planning') lors de la création d'un stage :
+        Crée automatiquement deux plannings (meetings de type 'planning') pour chaque stage :
         - Semaine 1 : Apprendre sur l'entreprise
         - Semaine 2 : Apprendre sur le travail
+        Les plannings de tous les stages sont créés en un seul appel à create().
         """
-        self.ensure_one()
-        
-        if not self.start_date:
-            _logger.warning(f"Impossible de créer les plannings : pas de date de début pour le stage {self.reference_number}")
-            return
-        
-        # Collecter tous les partenaires à assigner
-        partner_ids = []
-        
-        # Ajouter l'encadrant
-        if self.supervisor_id and self.supervisor_id.user_id and self.supervisor_id.user_id.partner_id:
-            partner_ids.append(self.supervisor_id.user_id.partner_id.id)
-        
-        # Ajouter tous les étudiants
-        for student in self.student_ids:
-            if student.user_id and student.user_id.partner_id:
-                partner_ids.append(student.user_id.partner_id.id)
-        
-        if not partner_ids:
-            _logger.warning(f"Aucun partenaire à assigner aux plannings pour le stage {self.reference_number}")
+        # Titres et ordres du jour traduits une seule fois pour tous les stages
+        names = {week: str(name) for week, name in PLANNING_NAMES.items()}
+        agendas = {week: str(agenda) for week, agenda in PLANNING_AGENDAS.items()}
+
+        meeting_vals_list = []
+        for stage in self:
+            if not stage.start_date:
+                _logger.warning("Impossible de créer les plannings : pas de date de début pour le stage %s",
+                                stage.reference_number)
+                continue
+
+            # Collecter tous les partenaires à assigner (sans doublons)
+            partner_ids = stage._get_stage_partners().ids
+
+            if not partner_ids:
+                _logger.warning("Aucun partenaire à assigner aux plannings pour le stage %s", stage.reference_number)
+                continue
+
+            # Calculer les dates pour les 2 semaines
+            week1_start = stage.start_date
+            week1_end = week1_start + timedelta(days=6)  # 7 jours (0-6)
+            week2_start = week1_end + timedelta(days=1)
+            week2_end = week2_start + timedelta(days=6)  # 7 jours
+
+            # Planning de la semaine 1 (comme meeting de type 'planning')
+            meeting_vals_list.append({
+                'name': names[1],
+                'stage_id': stage.id,
+                'meeting_type': 'planning',
+                'date': fields.Datetime.to_datetime(week1_start),
+                'duration': 168.0,  # 7 jours * 24 heures = 168 heures
+                'planning_start_date': week1_start,
+                'planning_end_date': week1_end,
+                'week_number': 1,
+                'partner_ids': [(6, 0, partner_ids)],
+                'agenda': agendas[1],
+                'state': 'scheduled'  # Créer directement en scheduled pour envoyer les emails
+            })
+
+            # Planning de la semaine 2 (comme meeting de type 'planning')
+            meeting_vals_list.append({
+                'name': names[2],
+                'stage_id': stage.id,
+                'meeting_type': 'planning',
+                'date': fields.Datetime.to_datetime(week2_start),
+                'duration': 168.0,  # 7 jours * 24 heures = 168 heures
+                'planning_start_date': week2_start,
+                'planning_end_date': week2_end,
+                'week_number': 2,
+                'partner_ids': [(6, 0, partner_ids)],
+                'agenda': agendas[2],
+                'state': 'scheduled'  # Créer directement en scheduled pour envoyer les emails
+            })
+
+        if not meeting_vals_list:
             return
-        
-        # Calculer les dates pour les 2 semaines
-        week1_start = self.start_date
-        week1_end = week1_start + timedelta(days=6)  # 7 jours (0-6)
-        week2_start = week1_end + timedelta(days=1)
-        week2_end = week2_start + timedelta(days=6)  # 7 jours
-        
-        # Convertir les dates de début en datetime pour le champ date du meeting
-        week1_datetime = fields.Datetime.to_datetime(week1_start)
-        week2_datetime = fields.Datetime.to_datetime(week2_start)
-        
-        # Créer le planning de la semaine 1 (comme meeting de type 'planning')
-        planning1 = self.env['internship.meeting'].create({
-            'name': _('Apprendre sur l\'entreprise'),
-            'stage_id': self.id,
-            'meeting_type': 'planning',
-            'date': week1_datetime,
-            'duration': 168.0,  # 7 jours * 24 heures = 168 heures
-            'planning_start_date': week1_start,
-            'planning_end_date': week1_end,
-            'week_number': 1,
-            'partner_ids': [(6, 0, partner_ids)],
-            'agenda': _(
-                '<p><strong>Semaine 1 : Apprendre sur l\'entreprise</strong></p>'
-                '<p>Cette première semaine est dédiée à la découverte de l\'entreprise :</p>'
-                '<ul>'
-                '<li>Présentation de l\'entreprise et de son histoire</li>'
-                '<li>Organisation et structure</li>'
-                '<li>Culture d\'entreprise et valeurs</li>'
-                '<li>Processus et méthodologies utilisées</li>'
-                '<li>Rencontre avec les équipes</li>'
-                '</ul>'
-            ),
-            'state': 'scheduled'  # Créer directement en scheduled pour envoyer les emails
-        })
-        
-        # Envoyer les notifications email pour le planning 1
-        try:
-            planning1._send_meeting_notification('internship_management.mail_template_meeting_invitation')
-        except Exception as e:
-            _logger.error(f"Erreur lors de l'envoi de l'email pour le planning 1 : {str(e)}")
-        
-        # Créer le planning de la semaine 2 (comme meeting de type 'planning')
-        planning2 = self.env['internship.meeting'].create({
-            'name': _('Apprendre sur le travail'),
-            'stage_id': self.id,
-            'meeting_type': 'planning',
-            'date': week2_datetime,
-            'duration': 168.0,  # 7 jours * 24 heures = 168 heures
-            'planning_start_date': week2_start,
-            'planning_end_date': week2_end,
-            'week_number': 2,
-            'partner_ids': [(6, 0, partner_ids)],
-            'agenda': _(
-                '<p><strong>Semaine 2 : Apprendre sur le travail</strong></p>'
-                '<p>Cette deuxième semaine est dédiée à l\'apprentissage du travail :</p>'
-                '<ul>'
-                '<li>Découverte des outils et technologies utilisés</li>'
-                '<li>Formation sur les processus de travail</li>'
-                '<li>Prise en main des projets en cours</li>'
-                '<li>Intégration dans l\'équipe</li>'
-                '<li>Début des premières tâches</li>'
-                '</ul>'
-            ),
-            'state': 'scheduled'  # Créer directement en scheduled pour envoyer les emails
-        })
-        
-        # Envoyer les notifications email pour le planning 2
-        try:
-            planning2._send_meeting_notification('internship_management.mail_template_meeting_invitation')
-        except Exception as e:
-            _logger.error(f"Erreur lors de l'envoi de l'email pour le planning 2 : {str(e)}")
-        
+
+        # Création en lot sans message "créé" ni valeurs de suivi par planning dans le Chatter
+        plannings = self.env['internship.meeting'].with_context(
+            mail_create_nolog=True, mail_notrack=True,
+        ).create(meeting_vals_list)
+
+        # Notifications email hors de la transaction de création : job dédié si queue_job
+        # est installé, sinon mise en file d'attente pour le cron d'envoi des mails.
+        template_xmlid = 'internship_management.mail_template_meeting_invitation'
+        if 'queue.job' in self.env:
+            plannings.with_delay(channel='root.mail')._send_meeting_notification(template_xmlid)
+        else:
+            plannings._send_meeting_notification(template_xmlid, force_send=False)
+
         _logger.info(
-            f"Plannings automatiques créés pour le stage {self.reference_number} : "
-            f"Semaine 1 ({week1_start} - {week1_end}) et Semaine 2 ({week2_start} - {week2_end})"
+            "Plannings automatiques créés pour les stages %s (%s planning(s))",
+            plannings.stage_id.mapped('reference_number'), len(plannings)
         )
 
     # ===============================
     # MÉTHODES MÉTIER (ACTIONS DES BOUTONS)
     # ===============================
 
+    def _set_state(self, new_state, from_states):
+        """
+        Applique un nouvel état à tout le recordset en une seule écriture.
+        Les stages déjà dans cet état sont ignorés pour éviter un UPDATE inutile ;
+        les autres doivent se trouver dans l'un des états de départ autorisés.
+        """
+        to_update = self.filtered(lambda s: s.state != new_state)
+        invalid = to_update.filtered(lambda s: s.state not in from_states)
+        if invalid:
+            state_labels = dict(self._fields['state']._description_selection(self.env))
+            raise UserError(_(
+                "Impossible de passer à l'état « %s » pour les stages suivants : %s",
+                state_labels[new_state], ', '.join(invalid.mapped('display_name'))
+            ))
+        if to_update:
+            to_update.write({'state': new_state})
+
     def action_submit(self):
         """Soumet le stage pour approbation."""
-        self.write({'state': 'submitted'})
+        self._set_state('submitted', ['draft'])
 
     def action_approve(self):
         """Approuve le stage."""
-        self.write({'state': 'approved'})
+        self._set_state('approved', ['submitted'])
 
     def action_start(self):
         """Démarre le stage."""
-        self.write({'state': 'in_progress'})
+        self._set_state('in_progress', ['approved'])
 
     def action_complete(self):
         """Marque le stage comme terminé."""
-        self.write({'state': 'completed'})
+        self._set_state('completed', ['in_progress'])
 
     def action_schedule_defense(self):
         """
         Crée une activité pour l'encadrant afin qu'il planifie la soutenance.
+        Fonctionne sur plusieurs stages : toutes les activités sont créées en un seul appel.
         """
-        self.ensure_one()
-        if self.state != 'completed':
+        if any(stage.state != 'completed' for stage in self):
             raise ValidationError(_("Seuls les stages terminés peuvent avoir une soutenance planifiée."))
 
-        if self.supervisor_id.user_id:
-            self.activity_schedule(
-                'mail.mail_activity_data_todo',
-                summary=_("Planifier la soutenance pour %s", self.title),
-                note=_(
-                    "Le stage est terminé. Veuillez configurer la date, "
-                    "le lieu et les membres du jury dans l'onglet 'Soutenance & Évaluation'."
-                ),
-                user_id=self.supervisor_id.user_id.id,
-            )
+        summary = _("Planifier la soutenance pour %s")
+        self._create_automated_activities(
+            'mail.mail_activity_data_todo',
+            lambda stage: stage.supervisor_id.user_id,
+            lambda stage: summary % stage.title,
+            _(
+                "Le stage est terminé. Veuillez configurer la date, "
+                "le lieu et les membres du jury dans l'onglet 'Soutenance & Évaluation'."
+            ),
+        )
 
         return {
             'type': 'ir.actions.client',
@@ -788,112 +829,125 @@ class InternshipStage(models.Model):
         }
 
     def action_evaluate(self):
-        """Marque le stage comme évalué après vérifications."""
-        self.ensure_one()
-        if self.state != 'completed':
-            raise ValidationError(_("Seuls les stages terminés peuvent être évalués."))
+        """Marque les stages comme évalués après vérifications."""
+        for stage in self:
+            if stage.state != 'completed':
+                raise ValidationError(_("Seuls les stages terminés peuvent être évalués."))
 
-        if not all([self.defense_date, self.jury_member_ids, self.defense_grade, self.final_grade]):
-            raise ValidationError(
-                _("Date de soutenance, membres du jury et notes doivent être renseignés avant d'évaluer."))
+            # Champs scalaires d'abord, le Many2many (lecture de la table de relation) en dernier
+            if not (stage.defense_grade and stage.final_grade and stage.defense_date and stage.jury_member_ids):
+                raise ValidationError(
+                    _("Date de soutenance, membres du jury et notes doivent être renseignés avant d'évaluer."))
 
         self.write({'state': 'evaluated', 'defense_status': 'completed'})
 
-        # Notifier les parties prenantes via le Chatter
-        partner_ids = []
-        # Notifier tous les étudiants du stage
-        for student in self.student_ids:
-            if student.user_id and student.user_id.partner_id:
-                partner_ids.append(student.user_id.partner_id.id)
-        if self.supervisor_id.user_id:
-            partner_ids.append(self.supervisor_id.user_id.partner_id.id)
-
-        self.message_post(
-            body=_(
-                "<strong>Évaluation du Stage Terminée</strong><br/>"
-                "Note de Soutenance: <strong>%s/20</strong><br/>"
-                "Note Finale: <strong>%s/20</strong>",
-                self.defense_grade, self.final_grade
-            ),
-            partner_ids=partner_ids,
-            message_type='comment',
-            subtype_xmlid='mail.mt_comment',
-        )
+        # Si queue_job est installé, les notifications sont publiées par un worker
+        # et l'action rend la main immédiatement ; sinon elles sont publiées ici.
+        if 'queue.job' in self.env:
+            self.with_delay(channel='root.mail')._notify_evaluation()
+        else:
+            self._notify_evaluation()
+
+    def _notify_evaluation(self):
+        """Publie le message d'évaluation dans le Chatter de chaque stage évalué."""
+        # Sous-type de message résolu une seule fois pour tout le lot
+        subtype_id = self.env['ir.model.data']._xmlid_to_res_id('mail.mt_comment')
+
+        # Notifier les parties prenantes via le Chatter (tous les étudiants et l'encadrant).
+        # Les emails passent par la file d'attente au lieu d'être envoyés pendant la requête.
+        for stage in self.with_context(mail_notify_force_send=False):
+            partner_ids = stage._get_stage_partners().ids
+
+            stage.message_post(
+                body=stage._evaluate_post_body(),
+                partner_ids=partner_ids,
+                message_type='comment',
+                subtype_id=subtype_id,
+            )
+
+    def _evaluate_post_body(self):
+        """Construit le message de Chatter publié lors de l'évaluation du stage."""
+        self.ensure_one()
+        return self.env['ir.qweb']._render('internship_management.message_stage_evaluated', {'stage': self})
 
     def action_cancel(self):
         """Annule le stage."""
-        if self.state == 'evaluated':
+        if 'evaluated' in self.mapped('state'):
             raise ValidationError(_("Un stage évalué ne peut pas être annulé."))
-        self.write({'state': 'cancelled'})
+        self._set_state('cancelled', ['draft', 'submitted', 'approved', 'in_progress', 'completed'])
 
     def action_reset_to_draft(self):
         """Réinitialise le stage à l'état brouillon."""
-        if self.state == 'evaluated':
+        if 'evaluated' in self.mapped('state'):
             raise ValidationError(_("Un stage évalué ne peut pas être réinitialisé."))
-        self.write({'state': 'draft'})
+        self._set_state('draft', ['submitted', 'approved', 'in_progress', 'completed', 'cancelled'])
 
 
     # ===============================
     # ACTIONS D'OUVERTURE DE VUES
     # ===============================
 
+    def _action_window(self, name, res_model, **values):
+        """Construit une action de fenêtre ; seules les clés propres à chaque bouton sont passées."""
+        action = {
+            'name': name,
+            'type': 'ir.actions.act_window',
+            'res_model': res_model,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+        action.update(values)
+        return action
+
     def action_create_presentation(self):
         """Ouvre le formulaire pour créer une nouvelle présentation."""
         self.ensure_one()
-        return {
-            'name': _('Téléverser une Présentation - %s', self.title),
-            'type': 'ir.actions.act_window',
-            'res_model': 'internship.presentation',
-            'view_mode': 'form',
-            'context': {
+        return self._action_window(
+            _('Téléverser une Présentation - %s', self.title),
+            'internship.presentation',
+            context={
                 'default_stage_id': self.id,
                 'default_supervisor_id': self.supervisor_id.id,
             },
-            'target': 'new',
-        }
+        )
 
     def action_create_task(self):
         """Ouvre le formulaire pour créer une nouvelle tâche."""
         self.ensure_one()
-        return {
-            'name': _('Créer une Tâche - %s', self.title),
-            'type': 'ir.actions.act_window',
-            'res_model': 'internship.todo',
-            'view_mode': 'form',
-            'view_id': self.env.ref('internship_management.view_internship_todo_form').id,
-            'context': {
+        return self._action_window(
+            _('Créer une Tâche - %s', self.title),
+            'internship.todo',
+            # _xmlid_to_res_id est mis en cache (ormcache) : pas de browse de la vue
+            view_id=self.env['ir.model.data']._xmlid_to_res_id(
+                'internship_management.view_internship_todo_form', raise_if_not_found=True),
+            context={
                 'default_stage_id': self.id,
                 'default_assigned_to_ids': [(6, 0, self.student_ids.ids)],
             },
-            'target': 'new',
-        }
+        )
 
     def action_open_tasks(self):
         """Ouvre la liste des tâches de ce stage."""
         self.ensure_one()
-        return {
-            'name': _('Tâches - %s', self.title),
-            'type': 'ir.actions.act_window',
-            'res_model': 'internship.todo',
-            'view_mode': 'kanban,tree,form',
-            'domain': [('stage_id', '=', self.id)],
-            'target': 'current',
-        }
+        return self._action_window(
+            _('Tâches - %s', self.title),
+            'internship.todo',
+            view_mode='kanban,tree,form',
+            domain=[('stage_id', '=', self.id)],
+            target='current',
+        )
 
     def action_schedule_meeting(self):
         """Ouvre le formulaire pour planifier une réunion."""
         self.ensure_one()
-        return {
-            'name': _('Planifier une Réunion - %s', self.title),
-            'type': 'ir.actions.act_window',
-            'res_model': 'internship.meeting',
-            'view_mode': 'form',
-            'context': {
+        return self._action_window(
+            _('Planifier une Réunion - %s', self.title),
+            'internship.meeting',
+            context={
                 'default_stage_id': self.id,
                 'default_supervisor_id': self.supervisor_id.id,
             },
-            'target': 'new',
-        }
+        )
 
     # ===============================
     # TÂCHE AUTOMATISÉE (CRON)
@@ -912,46 +966,83 @@ class InternshipStage(models.Model):
 
         # 2. Détection des stages inactifs
         fourteen_days_ago = fields.Datetime.now() - timedelta(days=14)
-        inactive_stages = self.search([
-            ('state', '=', 'in_progress'),
-            ('write_date', '<', fourteen_days_ago),
-            ('activity_ids', '=', False)
-        ])
-
-        for stage in inactive_stages:
-            if stage.supervisor_id.user_id:
-                stage.activity_schedule(
-                    'internship_management.activity_type_internship_alert',
-                    summary=_("Stage potentiellement inactif : %s", stage.title),
-                    note=_(
-                        "Aucune modification sur ce stage depuis plus de 14 jours. "
-                        "Un suivi est peut-être nécessaire."
-                    ),
-                    user_id=stage.supervisor_id.user_id.id
-                )
+        # Filtre sur la colonne indexée has_open_activities plutôt que sur la relation
+        # activity_ids. Les stages sans utilisateur encadrant sont exclus et le
+        # regroupement par encadrant est fait en SQL.
+        self.flush_model(['state', 'write_date', 'active', 'supervisor_id', 'has_open_activities'])
+        self.env['internship.supervisor'].flush_model(['user_id'])
+        self.env.cr.execute("""
+            SELECT s.supervisor_id, array_agg(s.id)
+              FROM internship_stage s
+              JOIN internship_supervisor sup ON sup.id = s.supervisor_id
+             WHERE s.active
+               AND s.state = 'in_progress'
+               AND s.write_date < %s
+               AND sup.user_id IS NOT NULL
+               AND s.has_open_activities IS NOT TRUE
+          GROUP BY s.supervisor_id
+        """, (fourteen_days_ago,))
+        stage_ids_by_supervisor = dict(self.env.cr.fetchall())
+
+        # Si queue_job est installé, un job par encadrant (traitement parallèle sur
+        # plusieurs workers) ; sinon tout est traité dans la transaction du cron.
+        if 'queue.job' in self.env:
+            for stage_ids in stage_ids_by_supervisor.values():
+                self.with_delay(channel='root.internship_monitoring', priority=20)._process_inactive_batch(stage_ids)
+        elif stage_ids_by_supervisor:
+            self._process_inactive_batch([
+                stage_id for stage_ids in stage_ids_by_supervisor.values() for stage_id in stage_ids
+            ])
 
         _logger.info("CRON: Suivi des stages terminé.")
 
+    @api.model
+    def _process_inactive_batch(self, stage_ids):
+        """Crée les activités d'alerte pour un lot de stages inactifs, en un seul appel."""
+        summary = _("Stage potentiellement inactif : %s")
+        self.browse(stage_ids)._create_automated_activities(
+            'internship_management.activity_type_internship_alert',
+            lambda stage: stage.supervisor_id.user_id,
+            lambda stage: summary % stage.title,
+            _(
+                "Aucune modification sur ce stage depuis plus de 14 jours. "
+                "Un suivi est peut-être nécessaire."
+            ),
+        )
+
     # ===============================
     # MÉTHODES UTILITAIRES
     # ===============================
 
-    def name_get(self):
-        """Affichage personnalisé du nom : [Référence] - Titre."""
-        result = []
+    @api.depends('reference_number', 'title')
+    def _compute_display_name(self):
+        """Affichage personnalisé du nom : [Référence] Titre (stocké et indexé)."""
         for stage in self:
-            name = f"[{stage.reference_number}] {stage.title}"
-            result.append((stage.id, name))
-        return result
+            stage.display_name = f"[{stage.reference_number}] {stage.title}"
 
     @api.model
-    def _name_search(self, name, args=None, operator='ilike', limit=100, name_get_uid=None, order=None):
-        """Recherche personnalisée sur la référence, le titre ou le nom de l'étudiant."""
+    def _name_search(self, name='', args=None, operator='ilike', limit=100, order=None):
+        """
+        Recherche personnalisée sur le nom affiché (référence + titre) ou le nom de l'étudiant.
+        Deux recherches indépendantes (chacune sur son index) dont les résultats sont réunis,
+        plutôt qu'un OR qui impose une jointure sur les étudiants pour toutes les lignes.
+        Quand la limite est atteinte, les correspondances sur le nom affiché sont retenues en
+        priorité ; le résultat final est toujours une requête triée selon `order`.
+        """
         args = args or []
-        domain = []
-        if name:
-            domain = ['|', '|',
-                      ('title', operator, name),
-                      ('reference_number', operator, name),
-                      ('student_ids.full_name', operator, name)]
-        return self._search(domain + args, limit=limit, access_rights_uid=name_get_uid, order=order)
+        if not name:
+            return self._search(args, limit=limit, order=order)
+        if operator in expression.NEGATIVE_TERM_OPERATORS:
+            domain = ['|', ('display_name', operator, name), ('student_ids.full_name', operator, name)]
+            return self._search(domain + args, limit=limit, order=order)
+
+        stage_ids = list(self._search([('display_name', operator, name)] + args, limit=limit, order=order))
+        if limit is None or len(stage_ids) < limit:
+            student_limit = limit and limit - len(stage_ids)
+            # Sous-requête sur les étudiants (index sur full_name) injectée telle quelle dans le
+            # IN de la table de relation, sans matérialiser la liste d'ids côté Python
+            students_query = self.env['internship.student']._search([('full_name', operator, name)])
+            student_domain = [('student_ids', 'in', students_query), ('id', 'not in', stage_ids)]
+            stage_ids += list(self._search(student_domain + args, limit=student_limit, order=order))
+        # Même type de retour que les autres branches (Query), dans l'ordre demandé
+        return self._search([('id', 'in', stage_ids)], order=order)
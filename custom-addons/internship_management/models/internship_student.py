@@ -34,6 +34,7 @@ class InternshipStudent(models.Model):
         required=True,
         tracking=True,
         size=100,
+        index='trigram',
         help="Nom complet de l'étudiant."
     )
 
@@ -43,6 +44,7 @@ class InternshipStudent(models.Model):
         'res.users',
         string='Compte utilisateur',
         ondelete='restrict',  # Bonne pratique: empêche la suppression d'un utilisateur lié à un étudiant
+        index=True,  # Filtré par les règles d'accès et la recherche de l'étudiant courant
         help="Compte utilisateur associé pour l'accès au système."
     )
 
@@ -216,31 +218,34 @@ class InternshipStudent(models.Model):
 
     @api.depends('internship_ids.final_grade')
     def _compute_average_grade(self):
-        """Calcule la note moyenne de tous les stages terminés."""
+        """Calcule la note moyenne de tous les stages terminés (moyenne calculée en SQL)."""
+        averages = dict(self.env['internship.stage']._read_group(
+            [('student_ids', 'in', self._origin.ids), ('final_grade', '>', 0)],
+            ['student_ids'],
+            ['final_grade:avg'],
+        ))
         for student in self:
-            completed_internships = student.internship_ids.filtered(lambda i: i.final_grade > 0)
-            if completed_internships:
-                total_grade = sum(completed_internships.mapped('final_grade'))
-                student.average_grade = total_grade / len(completed_internships)
-            else:
-                student.average_grade = 0.0
+            student.average_grade = averages.get(student._origin) or 0.0
 
     @api.depends('internship_ids.completion_percentage')
     def _compute_completion_rate(self):
-        """Calcule le taux de complétion moyen de tous les stages."""
+        """Calcule le taux de complétion moyen de tous les stages (moyenne calculée en SQL)."""
+        averages = dict(self.env['internship.stage']._read_group(
+            [('student_ids', 'in', self._origin.ids), ('state', '!=', 'cancelled')],
+            ['student_ids'],
+            ['completion_percentage:avg'],
+        ))
         for student in self:
-            active_internships = student.internship_ids.filtered(lambda i: i.state != 'cancelled')
-            if active_internships:
-                total_progress = sum(active_internships.mapped('completion_percentage'))
-                student.completion_rate = total_progress / len(active_internships)
-            else:
-                student.completion_rate = 0.0
+            student.completion_rate = averages.get(student._origin) or 0.0
 
     @api.depends('presentation_ids')
     def _compute_presentation_count(self):
-        """Calcule le nombre total de présentations soumises par l'étudiant."""
+        """Calcule le nombre total de présentations soumises par l'étudiant (une seule requête groupée)."""
+        counts = dict(self.env['internship.presentation']._read_group(
+            [('student_id', 'in', self._origin.ids)], ['student_id'], ['__count']
+        ))
         for student in self:
-            student.presentation_count = len(student.presentation_ids)
+            student.presentation_count = counts.get(student._origin, 0)
 
     # ===============================
     # CHAMPS TECHNIQUES
@@ -259,8 +264,9 @@ class InternshipStudent(models.Model):
     @api.constrains('birth_date')
     def _check_birth_date(self):
         """Vérifie que la date de naissance est plausible."""
+        today = fields.Date.today()
         for student in self:
-            if student.birth_date and student.birth_date > fields.Date.today():
+            if student.birth_date and student.birth_date > today:
                 raise ValidationError(_("La date de naissance ne peut pas être dans le futur."))
 
     # NOTE: Les contraintes sur l'email et le numéro de téléphone ne sont plus nécessaires ici
@@ -282,6 +288,9 @@ class InternshipStudent(models.Model):
         """Surcharge de la méthode 'create' pour la journalisation et la création automatique d'utilisateurs."""
         _logger.info(f"Création de {len(vals_list)} enregistrement(s) étudiant(s)")
 
+        # Identifiant du groupe étudiant résolu une seule fois (cache ormcache de ir.model.data)
+        student_group_id = self.env['ir.model.data']._xmlid_to_res_id(
+            'internship_management.group_internship_student', raise_if_not_found=True)
         for vals in vals_list:
             # Crée automatiquement un compte utilisateur si un email est fourni et qu'aucun utilisateur n'est lié
             if vals.get('email') and not vals.get('user_id'):
@@ -289,7 +298,7 @@ class InternshipStudent(models.Model):
                     'name': vals.get('full_name', 'Étudiant'),
                     'login': vals['email'],
                     'email': vals['email'],
-                    'groups_id': [(4, self.env.ref('internship_management.group_internship_student').id)]
+                    'groups_id': [(4, student_group_id)]
                 }
                 try:
                     user = self.env['res.users'].create(user_vals)
@@ -315,7 +324,7 @@ class InternshipStudent(models.Model):
         """Ouvre la liste des stages de l'étudiant dans une nouvelle vue."""
         self.ensure_one()
         return {
-            'name': _('Stages - %s') % self.full_name,
+            'name': _('Stages - %s', self.full_name),
             'type': 'ir.actions.act_window',
             'res_model': 'internship.stage',
             'view_mode': 'tree,form,kanban',
@@ -327,24 +336,22 @@ class InternshipStudent(models.Model):
     # MÉTHODES UTILITAIRES
     # ===============================
 
-    def name_get(self):
+    @api.depends('full_name', 'institution')
+    def _compute_display_name(self):
         """Affichage personnalisé du nom : Nom Complet (Établissement)."""
-        result = []
         for student in self:
-            name = student.full_name
-            if student.institution:
-                name = f"{name} ({student.institution})"
-            result.append((student.id, name))
-        return result
+            student.display_name = (
+                f"{student.full_name} ({student.institution})" if student.institution else student.full_name
+            )
 
     @api.model
     def _name_search(self, name='', args=None, operator='ilike', limit=100, order=None):
         """Recherche personnalisée : par nom, e-mail ou numéro d'étudiant."""
         args = args or []
-        domain = []
-        if name:
-            domain = ['|', '|',
-                      ('full_name', operator, name),
-                      ('email_from_user', operator, name),
-                      ('student_id_number', operator, name)]
+        if not name:
+            return self._search(args, limit=limit, order=order)
+        domain = ['|', '|',
+                  ('full_name', operator, name),
+                  ('email_from_user', operator, name),
+                  ('student_id_number', operator, name)]
         return self._search(domain + args, limit=limit, order=order)
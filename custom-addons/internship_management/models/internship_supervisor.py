@@ -7,6 +7,8 @@ y compris la gestion de leur capacité, leurs domaines d'expertise et le suivi
 de leur charge de travail.
 """
 
+from collections import defaultdict
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
@@ -39,6 +41,7 @@ class InternshipSupervisor(models.Model):
         string='Nom complet',
         required=True,
         tracking=True,
+        index='trigram',
         help="Nom complet de l'encadrant."
     )
 
@@ -46,6 +49,7 @@ class InternshipSupervisor(models.Model):
         'res.users',
         string='Compte utilisateur',
         ondelete='restrict',
+        index=True,  # Filtré par les règles d'accès et le cron de suivi des stages
         help="Compte utilisateur associé pour l'accès au système."
     )
 
@@ -128,17 +132,19 @@ class InternshipSupervisor(models.Model):
         (état 'approved' ou 'in_progress'). Un étudiant qui est dans plusieurs
         stages actifs n'est compté qu'une seule fois.
         """
+        # Une seule requête groupée par (encadrant, étudiant) : chaque couple n'apparaît
+        # qu'une fois, ce qui garantit l'unicité des étudiants suivis dans plusieurs stages.
+        student_counts = defaultdict(int)
+        groups = self.env['internship.stage']._read_group(
+            [('supervisor_id', 'in', self._origin.ids), ('state', 'in', ['approved', 'in_progress'])],
+            ['supervisor_id', 'student_ids'],
+            ['__count'],
+        )
+        for supervisor, student, _count in groups:
+            if student:
+                student_counts[supervisor.id] += 1
         for supervisor in self:
-            # Récupérer tous les stages actifs (approuvés ou en cours)
-            active_stages = supervisor.stage_ids.filtered(
-                lambda s: s.state in ['approved', 'in_progress']
-            )
-            # Récupérer tous les étudiants de tous les stages actifs
-            # Utiliser un set pour garantir l'unicité (au cas où un étudiant serait dans plusieurs stages)
-            all_student_ids = set()
-            for stage in active_stages:
-                all_student_ids.update(stage.student_ids.ids)
-            supervisor.current_students_count = len(all_student_ids)
+            supervisor.current_students_count = student_counts[supervisor._origin.id]
 
     # BONNE PRATIQUE: Remplacer l'@api.onchange par un champ calculé pour la robustesse.
     # L'inverse permet de modifier manuellement la valeur si nécessaire.
@@ -201,9 +207,12 @@ class InternshipSupervisor(models.Model):
 
     @api.depends('stage_ids')
     def _compute_stage_count(self):
-        """Calcule le nombre total de stages supervisés."""
+        """Calcule le nombre total de stages supervisés (une seule requête groupée)."""
+        counts = dict(self.env['internship.stage']._read_group(
+            [('supervisor_id', 'in', self._origin.ids)], ['supervisor_id'], ['__count']
+        ))
         for supervisor in self:
-            supervisor.stage_count = len(supervisor.stage_ids)
+            supervisor.stage_count = counts.get(supervisor._origin, 0)
 
     workload_percentage = fields.Float(
         string='Taux de charge',
@@ -242,7 +251,7 @@ class InternshipSupervisor(models.Model):
         """Ouvre la liste des stages supervisés dans une vue dédiée."""
         self.ensure_one()
         return {
-            'name': _('Stages encadrés par %s') % self.name,
+            'name': _('Stages encadrés par %s', self.name),
             'type': 'ir.actions.act_window',
             'res_model': 'internship.stage',
             'view_mode': 'tree,form,kanban',
@@ -254,25 +263,23 @@ class InternshipSupervisor(models.Model):
     # MÉTHODES UTILITAIRES
     # ===============================
 
-    def name_get(self):
+    @api.depends('name', 'department')
+    def _compute_display_name(self):
         """Affichage personnalisé du nom : Nom (Département)."""
-        result = []
         for supervisor in self:
-            name = supervisor.name
-            if supervisor.department:
-                name = f"{name} ({supervisor.department})"
-            result.append((supervisor.id, name))
-        return result
+            supervisor.display_name = (
+                f"{supervisor.name} ({supervisor.department})" if supervisor.department else supervisor.name
+            )
 
     @api.model
     def _name_search(self, name='', args=None, operator='ilike', limit=100, order=None):
         """Recherche personnalisée : par nom, e-mail, département ou poste."""
         args = args or []
-        domain = []
-        if name:
-            domain = ['|', '|', '|',
-                      ('name', operator, name),
-                      ('email', operator, name),
-                      ('department', operator, name),
-                      ('position', operator, name)]
+        if not name:
+            return self._search(args, limit=limit, order=order)
+        domain = ['|', '|', '|',
+                  ('name', operator, name),
+                  ('email', operator, name),
+                  ('department', operator, name),
+                  ('position', operator, name)]
         return self._search(domain + args, limit=limit, order=order)
@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 
 import logging
+from collections import defaultdict
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 
 _logger = logging.getLogger(__name__)
@@ -26,7 +27,7 @@ class InternshipTodo(models.Model):
     _name = 'internship.todo'
     _description = 'Gestion des Tâches de Stage'
     # Héritage pour la messagerie, le suivi et les activités
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'internship.automated.activity.mixin']
     # Ordre d'affichage par défaut : séquence, date limite, puis priorité.
     _order = 'sequence, deadline, priority desc, id'
     _rec_name = 'name'
@@ -175,6 +176,10 @@ class InternshipTodo(models.Model):
         help="Définit l'ordre d'affichage des tâches dans la vue liste."
     )
 
+    def init(self):
+        """Index composite utilisé par les statistiques de tâches groupées par stage et statut."""
+        tools.create_index(self._cr, 'internship_todo_stage_id_state_idx', self._table, ['stage_id', 'state'])
+
     # ===================================================
     # CONTRAINTES
     # ===================================================
@@ -272,25 +277,22 @@ class InternshipTodo(models.Model):
     @api.model
     def _cron_detect_overdue_tasks(self):
         """
-        CRON: Détecte les tâches en retard et planifie une activité pour l'encadrant.
+        CRON: Détecte les tâches en retard et planifie une activité pour l'encadrant
+        (toutes les activités sont créées en un seul appel).
         """
         overdue_tasks = self.search([
             ('deadline', '<', fields.Date.today()),
             ('state', 'in', ['todo', 'in_progress']),
             ('activity_ids', '=', False)  # Pour ne pas créer de doublons
         ])
-
-        for task in overdue_tasks:
-            if task.stage_id.supervisor_id.user_id:
-                task.activity_schedule(
-                    'internship_management.activity_type_internship_alert',
-                    summary=_("Tâche en retard: %s", task.name),
-                    note=_(
-                        "La date limite du %s est dépassée. Veuillez vérifier avec l'étudiant(e).",
-                        task.deadline.strftime('%d/%m/%Y')
-                    ),
-                    user_id=task.stage_id.supervisor_id.user_id.id
-                )
+        summary = _("Tâche en retard: %s")
+        note = _("La date limite du %s est dépassée. Veuillez vérifier avec l'étudiant(e).")
+        overdue_tasks._create_automated_activities(
+            'internship_management.activity_type_internship_alert',
+            lambda task: task.stage_id.supervisor_id.user_id,
+            lambda task: summary % task.name,
+            lambda task: note % task.deadline.strftime('%d/%m/%Y'),
+        )
 
     # ===================================================
     # ACTIONS DES BOUTONS (WORKFLOW)
@@ -345,14 +347,20 @@ class InternshipTodo(models.Model):
         1. Assigner automatiquement la tâche à l'étudiant du stage si créée par un encadrant
         2. Ajouter l'encadrant comme follower
         """
+        # On vérifie une seule fois si le créateur est un encadrant
+        is_supervisor = self.env.user.has_group('internship_management.group_internship_supervisor')
+        stages_by_id = {}
+        if is_supervisor:
+            stages = self.env['internship.stage'].browse({
+                vals['stage_id'] for vals in vals_list
+                if vals.get('stage_id') and not vals.get('assigned_to_ids')
+            })
+            stages_by_id = {stage.id: stage for stage in stages}
         for vals in vals_list:
             # Si un stage est défini et que personne n'est assigné manuellement
             if vals.get('stage_id') and not vals.get('assigned_to_ids'):
-                # On vérifie si le créateur est un encadrant
-                is_supervisor = self.env.user.has_group('internship_management.group_internship_supervisor')
-
                 if is_supervisor:
-                    stage = self.env['internship.stage'].browse(vals['stage_id'])
+                    stage = stages_by_id[vals['stage_id']]
                     if stage.student_ids:
                         # Utiliser les IDs des étudiants directement (pas user_id.id)
                         student_ids = stage.student_ids.ids
@@ -369,12 +377,15 @@ class InternshipTodo(models.Model):
 
         records = super().create(vals_list)
 
-        # Ajouter l'encadrant comme follower pour chaque enregistrement
+        # Ajouter l'encadrant comme follower : les tâches sont regroupées par encadrant
+        # pour créer les abonnements en un seul appel par partenaire
+        records_by_partner = defaultdict(lambda: self.env['internship.todo'])
         for record in records:
-            if record.stage_id and record.stage_id.supervisor_id and record.stage_id.supervisor_id.user_id:
-                supervisor_partner = record.stage_id.supervisor_id.user_id.partner_id
-                if supervisor_partner:
-                    record.message_subscribe(partner_ids=[supervisor_partner.id])
+            supervisor_partner = record.stage_id.supervisor_id.user_id.partner_id
+            if supervisor_partner:
+                records_by_partner[supervisor_partner] |= record
+        for supervisor_partner, partner_records in records_by_partner.items():
+            partner_records.message_subscribe(partner_ids=supervisor_partner.ids)
 
         return records
 
@@ -382,14 +393,13 @@ class InternshipTodo(models.Model):
     # Méthodes pour l'affichage (non modifiées, déjà bonnes)
     # ===================================================
 
-    def name_get(self):
-        """Affichage personnalisé du nom : Nom (Statut)."""
-        result = []
+    @api.depends('name', 'state')
+    def _compute_display_name(self):
+        """Affichage personnalisé du nom : Nom (Statut), calculé une fois par lot via display_name."""
         # Traduction des statuts pour un affichage propre
         status_translations = dict(self._fields['state'].selection)
 
         for todo in self:
             name = todo.name or ''
             state_name = status_translations.get(todo.state, '')
-            result.append((todo.id, f"{name} ({state_name})"))
-        return result
+            todo.display_name = f"{name} ({state_name})"
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestInternshipStageReference(TransactionCase):
+    """Numéros de référence réservés en lot à la création de plusieurs stages."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.sequence = cls.env.ref('internship_management.seq_internship_stage')
+
+    def _create_stages(self, count):
+        return self.env['internship.stage'].create([
+            {'title': 'Stage %s' % index} for index in range(count)
+        ])
+
+    def _reference_numbers(self, stages):
+        prefix = self.sequence.prefix or ''
+        return [int(stage.reference_number[len(prefix):]) for stage in stages]
+
+    def _assert_consecutive_references(self, stages):
+        references = stages.mapped('reference_number')
+        self.assertEqual(len(set(references)), len(stages), "Les références doivent être uniques.")
+        numbers = self._reference_numbers(stages)
+        increment = self.sequence.number_increment
+        expected = [numbers[0] + index * increment for index in range(len(stages))]
+        self.assertEqual(numbers, expected, "Les références d'un même lot doivent être consécutives.")
+
+    def test_reference_numbers_standard_sequence(self):
+        self.sequence.implementation = 'standard'
+        stages = self._create_stages(3)
+        self._assert_consecutive_references(stages)
+
+        # Un second lot continue la séquence sans chevauchement
+        next_stages = self._create_stages(2)
+        self._assert_consecutive_references(next_stages)
+        self.assertGreater(self._reference_numbers(next_stages)[0], self._reference_numbers(stages)[-1])
+
+    def test_reference_numbers_no_gap_sequence(self):
+        self.sequence.implementation = 'no_gap'
+        stages = self._create_stages(3)
+        self._assert_consecutive_references(stages)
+        self.assertEqual(
+            self.sequence.number_next,
+            self._reference_numbers(stages)[-1] + self.sequence.number_increment,
+        )
+
+    def test_reference_numbers_no_gap_pending_write(self):
+        """Une écriture ORM non encore envoyée en base sur la séquence est prise en compte."""
+        self.sequence.implementation = 'no_gap'
+        self.sequence.number_next = 500
+        stages = self._create_stages(3)
+        self._assert_consecutive_references(stages)
+        self.assertEqual(self._reference_numbers(stages)[0], 500)